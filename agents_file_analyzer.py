@@ -1,168 +1,31 @@
 import os
-import json
-from datetime import datetime, timedelta
-from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Optional
 from dotenv import load_dotenv
-from agents import Agent, function_tool, Runner
+from agents import Agent, Runner
+
+from file_tools import (
+    find_recent_files,
+    read_file_content,
+    read_files_content,
+    analyze_file_types,
+    save_report,
+)
 
 # 環境変数を読み込み
 load_dotenv()
 
+# 接続テスト用エージェント（初回呼び出し時に生成して使い回す）
+_test_agent: Optional[Agent] = None
 
-@function_tool
-def find_recent_files(folder_path: str, days: int = 30) -> str:
-    """
-    指定フォルダから最新N日以内のファイルを取得
-    
-    Args:
-        folder_path: 分析対象のフォルダパス
-        days: 分析期間（日数）
-    
-    Returns:
-        最新ファイルのリスト
-    """
-    folder = Path(folder_path)
-    if not folder.exists():
-        raise ValueError(f"フォルダが存在しません: {folder_path}")
-    
-    cutoff_date = datetime.now() - timedelta(days=days)
-    recent_files = []
-    
-    for file_path in folder.rglob("*"):
-        if file_path.is_file():
-            try:
-                modified_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if modified_time > cutoff_date:
-                    recent_files.append({
-                        "path": str(file_path),
-                        "modified": modified_time.isoformat(),
-                        "size": file_path.stat().st_size
-                    })
-            except Exception:
-                continue
-    
-    # 更新日時でソート
-    recent_files.sort(key=lambda x: x["modified"], reverse=True)
-    
-    import json
-    return json.dumps(recent_files, ensure_ascii=False, indent=2)
-
-
-@function_tool
-def read_file_content(file_path: str, max_chars: int = 2000) -> str:
-    """
-    ファイル内容を読み込み（Obsidian対応）
-    
-    Args:
-        file_path: ファイルパス
-        max_chars: 読み込む最大文字数
-    
-    Returns:
-        ファイル内容
-    """
-    import re
-    
-    # Obsidianでサポートされるファイル拡張子
-    obsidian_extensions = {'.md', '.txt', '.json', '.csv', '.html', '.xml', '.js', '.ts', '.py', '.css', '.yaml', '.yml'}
-    
-    file_ext = Path(file_path).suffix.lower()
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # 内容を制限
-        if len(content) > max_chars:
-            content = content[:max_chars] + "..."
-            
-        # Obsidianのマークダウンリンク記法を処理
-        if file_ext == '.md':
-            # Obsidianの内部リンク [[リンク名]] を処理
-            content = re.sub(r'\[\[([^\]]+)\]\]', r'[[\1]]（Obsidianリンク）', content)
-            
-            # Obsidianのタグ #タグ名 を処理
-            content = re.sub(r'#([a-zA-Z0-9_\-/]+)', r'#\1（Obsidianタグ）', content)
-            
-            # Obsidianのブロック参照 ^ブロックID を処理
-            content = re.sub(r'\^([a-zA-Z0-9\-]+)', r'^\\1（ブロック参照）', content)
-            
-        return content
-    except UnicodeDecodeError:
-        # UTF-8で読めない場合、他のエンコーディングを試行
-        encodings = ['shift_jis', 'cp932', 'latin1', 'utf-16']
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                if len(content) > max_chars:
-                    content = content[:max_chars] + "..."
-                return f"[{encoding}エンコーディング] {content}"
-            except Exception:
-                continue
-        return f"[読み込み不可能なエンコーディング: {file_path}]"
-    except Exception as e:
-        return f"[読み込みエラー: {str(e)}]"
 
-
-@function_tool
-def analyze_file_types(files_json: str) -> str:
-    """
-    ファイルタイプを分析
-    
-    Args:
-        files_json: ファイル情報のリスト（JSON文字列）
-    
-    Returns:
-        ファイルタイプの統計情報（JSON文字列）
-    """
-    import json
-    
-    try:
-        files = json.loads(files_json)
-    except json.JSONDecodeError:
-        return json.dumps({"error": "Invalid JSON format"}, ensure_ascii=False)
-    
-    type_stats = {}
-    total_size = 0
-    
-    for file_info in files:
-        file_path = Path(file_info["path"])
-        ext = file_path.suffix.lower() or "拡張子なし"
-        
-        if ext not in type_stats:
-            type_stats[ext] = {"count": 0, "total_size": 0}
-        
-        type_stats[ext]["count"] += 1
-        type_stats[ext]["total_size"] += file_info["size"]
-        total_size += file_info["size"]
-    
-    result = {
-        "file_types": type_stats,
-        "total_files": len(files),
-        "total_size": total_size
-    }
-    return json.dumps(result, ensure_ascii=False, indent=2)
-
-
-@function_tool
-def save_report(report_data: str, output_path: str) -> str:
-    """
-    レポートをJSONファイルに保存
-    
-    Args:
-        report_data: レポートデータ（JSON文字列）
-        output_path: 保存先パス
-    
-    Returns:
-        保存結果メッセージ
-    """
-    try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(report_data)
-        return f"レポートを {output_path} に保存しました。"
-    except Exception as e:
-        return f"保存エラー: {str(e)}"
+def _get_test_agent() -> Agent:
+    global _test_agent
+    if _test_agent is None:
+        _test_agent = Agent(
+            name="接続テスト",
+            instructions="「接続テスト成功」と短く回答してください。"
+        )
+    return _test_agent
 
 
 class FileAnalyzerAgent:
@@ -192,6 +55,7 @@ class FileAnalyzerAgent:
             tools=[
                 find_recent_files,
                 read_file_content,
+                read_files_content,
                 analyze_file_types,
                 save_report
             ]
@@ -215,7 +79,7 @@ class FileAnalyzerAgent:
         以下の手順で分析を行ってください：
         1. find_recent_files関数を使って最新{days}日以内のファイルを取得（JSON文字列で返されます）
         2. analyze_file_types関数にファイルのJSON文字列を渡してファイルタイプを分析
-        3. 主要なファイル（最新10個程度）についてread_file_content関数で内容を確認
+        3. 主要なファイル（最新10個程度）のパスをread_files_content関数にまとめて渡して内容を確認
         4. 分析結果をまとめて詳細なレポートを作成
         {'5. save_report関数を使って結果を' + output_path + 'に保存' if output_path else ''}
         
@@ -247,7 +111,7 @@ class FileAnalyzerAgent:
         以下の手順で分析を行ってください：
         1. find_recent_files関数を使って最新{days}日以内のファイルを取得（JSON文字列で返されます）
         2. analyze_file_types関数にファイルのJSON文字列を渡してファイルタイプを分析
-        3. 主要なファイル（最新10個程度）についてread_file_content関数で内容を確認
+        3. 主要なファイル（最新10個程度）のパスをread_files_content関数にまとめて渡して内容を確認
         4. 分析結果をまとめて詳細なレポートを作成
         {'5. save_report関数を使って結果を' + output_path + 'に保存' if output_path else ''}
         
@@ -269,17 +133,11 @@ class FileAnalyzerAgent:
             接続可能かどうか
         """
         try:
-            # 簡単なテスト用エージェント
-            test_agent = Agent(
-                name="接続テスト",
-                instructions="「接続テスト成功」と短く回答してください。"
-            )
-            
             result = Runner.run_sync(
-                test_agent,
+                _get_test_agent(),
                 "接続テストを実行してください。"
             )
-            
+
             return "接続テスト" in result.final_output
         except Exception as e:
             print(f"接続テストでエラーが発生: {str(e)}")
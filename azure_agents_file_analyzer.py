@@ -1,18 +1,36 @@
+import functools
 import os
-import json
-from datetime import datetime, timedelta
-from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Optional
 import asyncio
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
-from agents import Agent, function_tool, Runner, set_tracing_disabled
+from agents import Agent, Runner, set_tracing_disabled
 from pydantic import BaseModel
 
+from file_tools import (
+    find_recent_files,
+    read_file_content,
+    read_files_content,
+    analyze_file_types,
+    save_report,
+)
 
 # 環境変数を読み込み
 load_dotenv()
 
+# 接続テスト用エージェント（初回呼び出し時に生成して使い回す）
+_test_agent: Optional[Agent] = None
+
+
+def _get_test_agent() -> Agent:
+    global _test_agent
+    if _test_agent is None:
+        _test_agent = Agent(
+            name="接続テスト",
+            instructions="「接続テスト成功」と短く回答してください。"
+        )
+    return _test_agent
+
 # Azure OpenAI Service設定
 AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview")
@@ -32,183 +50,34 @@ class AzureConfig(BaseModel):
     
     @classmethod
     def from_env(cls) -> "AzureConfig":
-        """環境変数から設定を読み込み"""
-        api_key = os.getenv("AZURE_OPENAI_API_KEY")
-        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-        deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
-        
-        if not all([api_key, endpoint, deployment]):
-            missing = []
-            if not api_key:
-                missing.append("AZURE_OPENAI_API_KEY")
-            if not endpoint:
-                missing.append("AZURE_OPENAI_ENDPOINT")
-            if not deployment:
-                missing.append("AZURE_OPENAI_DEPLOYMENT")
-            
-            raise ValueError(f"以下の環境変数が設定されていません: {', '.join(missing)}")
-        
-        return cls(
-            api_key=api_key,
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview"),
-            endpoint=endpoint,
-            deployment=deployment
-        )
+        """環境変数から設定を読み込み（結果はプロセス内でキャッシュ）"""
+        return _load_azure_config()
 
 
-@function_tool
-def find_recent_files(folder_path: str, days: int = 30) -> str:
-    """
-    指定フォルダから最新N日以内のファイルを取得
-    
-    Args:
-        folder_path: 分析対象のフォルダパス
-        days: 分析期間（日数）
-    
-    Returns:
-        最新ファイルのリスト
-    """
-    folder = Path(folder_path)
-    if not folder.exists():
-        raise ValueError(f"フォルダが存在しません: {folder_path}")
-    
-    cutoff_date = datetime.now() - timedelta(days=days)
-    recent_files = []
-    
-    for file_path in folder.rglob("*"):
-        if file_path.is_file():
-            try:
-                modified_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if modified_time > cutoff_date:
-                    recent_files.append({
-                        "path": str(file_path),
-                        "modified": modified_time.isoformat(),
-                        "size": file_path.stat().st_size
-                    })
-            except Exception:
-                continue
-    
-    # 更新日時でソート
-    recent_files.sort(key=lambda x: x["modified"], reverse=True)
-    
-    import json
-    return json.dumps(recent_files, ensure_ascii=False, indent=2)
+@functools.lru_cache(maxsize=1)
+def _load_azure_config() -> AzureConfig:
+    """環境変数からAzureConfigを構築する（初回のみ評価）"""
+    api_key = os.getenv("AZURE_OPENAI_API_KEY")
+    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
+    if not all([api_key, endpoint, deployment]):
+        missing = []
+        if not api_key:
+            missing.append("AZURE_OPENAI_API_KEY")
+        if not endpoint:
+            missing.append("AZURE_OPENAI_ENDPOINT")
+        if not deployment:
+            missing.append("AZURE_OPENAI_DEPLOYMENT")
 
-@function_tool
-def read_file_content(file_path: str, max_chars: int = 2000) -> str:
-    """
-    ファイル内容を読み込み（Obsidian対応）
-    
-    Args:
-        file_path: ファイルパス
-        max_chars: 読み込む最大文字数
-    
-    Returns:
-        ファイル内容
-    """
-    import re
-    
-    # Obsidianでサポートされるファイル拡張子
-    obsidian_extensions = {'.md', '.txt', '.json', '.csv', '.html', '.xml', '.js', '.ts', '.py', '.css', '.yaml', '.yml'}
-    
-    file_ext = Path(file_path).suffix.lower()
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # 内容を制限
-        if len(content) > max_chars:
-            content = content[:max_chars] + "..."
-            
-        # Obsidianのマークダウンリンク記法を処理
-        if file_ext == '.md':
-            # Obsidianの内部リンク [[リンク名]] を処理
-            content = re.sub(r'\[\[([^\]]+)\]\]', r'[[\1]]（Obsidianリンク）', content)
-            
-            # Obsidianのタグ #タグ名 を処理
-            content = re.sub(r'#([a-zA-Z0-9_\-/]+)', r'#\1（Obsidianタグ）', content)
-            
-            # Obsidianのブロック参照 ^ブロックID を処理
-            content = re.sub(r'\^([a-zA-Z0-9\-]+)', r'^\\1（ブロック参照）', content)
-            
-        return content
-    except UnicodeDecodeError:
-        # UTF-8で読めない場合、他のエンコーディングを試行
-        encodings = ['shift_jis', 'cp932', 'latin1', 'utf-16']
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                if len(content) > max_chars:
-                    content = content[:max_chars] + "..."
-                return f"[{encoding}エンコーディング] {content}"
-            except Exception:
-                continue
-        return f"[読み込み不可能なエンコーディング: {file_path}]"
-    except Exception as e:
-        return f"[読み込みエラー: {str(e)}]"
+        raise ValueError(f"以下の環境変数が設定されていません: {', '.join(missing)}")
 
-
-@function_tool
-def analyze_file_types(files_json: str) -> str:
-    """
-    ファイルタイプを分析
-    
-    Args:
-        files_json: ファイル情報のリスト（JSON文字列）
-    
-    Returns:
-        ファイルタイプの統計情報（JSON文字列）
-    """
-    import json
-    
-    try:
-        files = json.loads(files_json)
-    except json.JSONDecodeError:
-        return json.dumps({"error": "Invalid JSON format"}, ensure_ascii=False)
-    
-    type_stats = {}
-    total_size = 0
-    
-    for file_info in files:
-        file_path = Path(file_info["path"])
-        ext = file_path.suffix.lower() or "拡張子なし"
-        
-        if ext not in type_stats:
-            type_stats[ext] = {"count": 0, "total_size": 0}
-        
-        type_stats[ext]["count"] += 1
-        type_stats[ext]["total_size"] += file_info["size"]
-        total_size += file_info["size"]
-    
-    result = {
-        "file_types": type_stats,
-        "total_files": len(files),
-        "total_size": total_size
-    }
-    return json.dumps(result, ensure_ascii=False, indent=2)
-
-
-@function_tool
-def save_report(report_data: str, output_path: str) -> str:
-    """
-    レポートをJSONファイルに保存
-    
-    Args:
-        report_data: レポートデータ（JSON文字列）
-        output_path: 保存先パス
-    
-    Returns:
-        保存結果メッセージ
-    """
-    try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(report_data)
-        return f"レポートを {output_path} に保存しました。"
-    except Exception as e:
-        return f"保存エラー: {str(e)}"
+    return AzureConfig(
+        api_key=api_key,
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview"),
+        endpoint=endpoint,
+        deployment=deployment
+    )
 
 
 class AzureFileAnalyzerAgent:
@@ -217,6 +86,9 @@ class AzureFileAnalyzerAgent:
     def __init__(self, config: Optional[AzureConfig] = None):
         # 設定の初期化
         self.config = config or AzureConfig.from_env()
+
+        # 同期実行で使い回すイベントループ（遅延生成）
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
         # Azure OpenAI用のカスタムクライアントを作成
         self.custom_client = AsyncOpenAI(
@@ -247,6 +119,7 @@ class AzureFileAnalyzerAgent:
             tools=[
                 find_recent_files,
                 read_file_content,
+                read_files_content,
                 analyze_file_types,
                 save_report
             ]
@@ -270,7 +143,7 @@ class AzureFileAnalyzerAgent:
         以下の手順で詳細な分析を行ってください：
         1. find_recent_files関数を使って最新{days}日以内のファイルを取得（JSON文字列で返されます）
         2. analyze_file_types関数にファイルのJSON文字列を渡してファイルタイプの統計を取得
-        3. 主要なファイル（最新10-15個程度）についてread_file_content関数で内容を確認
+        3. 主要なファイル（最新10-15個程度）のパスをread_files_content関数にまとめて渡して内容を確認
         4. 分析結果をまとめて詳細なレポートを作成
         {'5. save_report関数を使って結果を' + output_path + 'に保存' if output_path else ''}
         
@@ -304,7 +177,25 @@ class AzureFileAnalyzerAgent:
         Returns:
             分析結果
         """
-        return asyncio.run(self.analyze_folder(folder_path, days, output_path))
+        # asyncio.runはイベントループとHTTP接続プールを毎回作り直すため、
+        # ループを使い回してTLSハンドシェイクを1回に抑える
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(
+            self.analyze_folder(folder_path, days, output_path)
+        )
+
+    async def __aenter__(self) -> "AzureFileAnalyzerAgent":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.custom_client.close()
+
+    def close(self) -> None:
+        """使い回しているHTTPクライアントとイベントループを閉じる"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.run_until_complete(self.custom_client.close())
+            self._loop.close()
     
     def verify_connection(self) -> bool:
         """
@@ -313,19 +204,29 @@ class AzureFileAnalyzerAgent:
         Returns:
             接続可能かどうか
         """
+        # まず軽量なGETでエンドポイントの疎通を確認（LLM呼び出しなし・トークン消費ゼロ）
         try:
-            # 簡単なテスト用エージェント
-            test_agent = Agent(
-                name="接続テスト",
-                instructions="「接続テスト成功」と短く回答してください。"
+            import requests
+            response = requests.get(
+                f"{self.config.endpoint}/openai/models",
+                params={"api-version": self.config.api_version},
+                headers={"api-key": self.config.api_key},
+                timeout=5.0,
             )
-            
+            # 2xxのみを成功とみなす（401/403などの認証エラーは下のフルテストで検出する）
+            if 200 <= response.status_code < 300:
+                return True
+        except Exception:
+            # 疎通確認に失敗した場合はフルの接続テストにフォールバック
+            pass
+
+        try:
             result = Runner.run_sync(
-                test_agent,
+                _get_test_agent(),
                 "接続テストを実行してください。",
                 client=self.custom_client
             )
-            
+
             return "接続テスト" in result.final_output
         except Exception as e:
             print(f"接続テストでエラーが発生: {str(e)}")
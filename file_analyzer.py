@@ -1,14 +1,85 @@
 import os
 import json
+import asyncio
+import hashlib
+import heapq
+import operator
+import re
+import aiohttp
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+# 文字コード判定ライブラリ（cchardetがあれば高速版を優先）
+try:
+    import cchardet as chardet
+except ImportError:
+    import chardet
+
+# Obsidianでサポートされるファイル拡張子（テキストとして読む対象）
+OBSIDIAN_EXTS = frozenset({
+    '.md', '.txt', '.json', '.csv', '.html', '.xml',
+    '.js', '.ts', '.py', '.css', '.yaml', '.yml'
+})
+
+# Obsidian記法の正規表現はモジュール読み込み時に一度だけコンパイル
+_OBS_LINK = re.compile(r'\[\[([^\]]+)\]\]')
+_OBS_TAG = re.compile(r'#([a-zA-Z0-9_\-/]+)')
+_OBS_BLOCK = re.compile(r'\^([a-zA-Z0-9\-]+)')
+
+
+def _walk(root: str):
+    """os.scandirでディレクトリを再帰走査し、ファイルのDirEntryを返す"""
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except Exception:
+            continue
+        try:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+                except Exception:
+                    continue
+        finally:
+            it.close()
+
+
+def _collect_recent(root: str, cutoff_ts: float) -> List[Dict[str, Any]]:
+    """サブツリーを走査してcutoff以降に更新されたファイル情報を集める"""
+    results = []
+    for entry in _walk(root):
+        try:
+            # statは1回だけ呼び、mtimeとsizeの両方に使い回す
+            st = entry.stat()
+            # floatのまま比較し、フィルタを通過したものだけdatetimeを生成
+            if st.st_mtime > cutoff_ts:
+                results.append({
+                    "path": entry.path,
+                    "modified": datetime.fromtimestamp(st.st_mtime).isoformat(),
+                    "_mtime": st.st_mtime,
+                    "size": st.st_size
+                })
+        except Exception:
+            continue
+    return results
 
 
 class OllamaClient:
     def __init__(self, base_url: str = "http://localhost:11434"):
         self.base_url = base_url
+
+        # コネクションを使い回してリクエストごとのTCP+HTTPハンドシェイクを省く
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
     
     def generate(self, model: str, prompt: str) -> str:
         """Ollamaを使ってテキストを生成"""
@@ -20,106 +91,232 @@ class OllamaClient:
         }
         
         try:
-            response = requests.post(url, json=payload)
+            response = self._session.post(url, json=payload)
             response.raise_for_status()
             return response.json()["response"]
         except Exception as e:
             return f"エラーが発生しました: {str(e)}"
 
+    def generate_stream(self, model: str, prompt: str) -> str:
+        """Ollamaを使ってテキストを生成（トークンを到着順に表示する版）
+
+        生成された断片をその場でコンソールに出力しつつバッファに貯め、
+        最後に全文を返す。合計時間は変わらないが体感の待ち時間が減る。
+        """
+        url = f"{self.base_url}/api/generate"
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True
+        }
+
+        try:
+            chunks = []
+            with self._session.post(url, json=payload, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    piece = json.loads(line).get("response", "")
+                    if piece:
+                        print(piece, end='', flush=True)
+                        chunks.append(piece)
+            print()
+            return "".join(chunks)
+        except Exception as e:
+            return f"エラーが発生しました: {str(e)}"
+
+
+class AsyncOllamaClient:
+    """aiohttpでOllamaへ並行リクエストを投げるクライアント"""
+    def __init__(self, base_url: str = "http://localhost:11434", max_concurrency: int = 8):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+
+    async def generate(self, session: "aiohttp.ClientSession", model: str, prompt: str,
+                       semaphore: "asyncio.Semaphore") -> str:
+        """Ollamaを使ってテキストを生成（セマフォで同時リクエスト数を制限）"""
+        url = f"{self.base_url}/api/generate"
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": False
+        }
+
+        async with semaphore:
+            try:
+                async with session.post(url, json=payload) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+                    return data["response"]
+            except Exception as e:
+                return f"エラーが発生しました: {str(e)}"
+
 
 class FileAnalyzer:
     def __init__(self, ollama_model: str = "llama3.2"):
         self.ollama = OllamaClient()
+        self.async_ollama = AsyncOllamaClient()
         self.model = ollama_model
     
-    def find_recent_files(self, folder_path: str, days: int = 30) -> List[Dict[str, Any]]:
-        """指定フォルダから最新N日以内のファイルを取得"""
+    def find_recent_files(self, folder_path: str, days: int = 30,
+                          limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """指定フォルダから最新N日以内のファイルを取得
+
+        limitを指定すると全件ソートの代わりにheapq.nlargestを使い、
+        更新日時の新しい上位limit件だけを返す。
+        """
         folder = Path(folder_path)
         if not folder.exists():
             raise ValueError(f"フォルダが存在しません: {folder_path}")
         
-        cutoff_date = datetime.now() - timedelta(days=days)
+        cutoff_ts = (datetime.now() - timedelta(days=days)).timestamp()
         recent_files = []
-        
-        for file_path in folder.rglob("*"):
-            if file_path.is_file():
-                try:
-                    modified_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                    if modified_time > cutoff_date:
-                        recent_files.append({
-                            "path": str(file_path),
-                            "modified": modified_time.isoformat(),
-                            "size": file_path.stat().st_size
-                        })
-                except Exception:
-                    continue
-        
-        # 更新日時でソート
-        recent_files.sort(key=lambda x: x["modified"], reverse=True)
+        subdirs = []
+
+        # トップレベルのファイルは直接処理し、サブディレクトリはスレッドに分配
+        try:
+            with os.scandir(str(folder)) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                        if st.st_mtime > cutoff_ts:
+                            recent_files.append({
+                                "path": entry.path,
+                                "modified": datetime.fromtimestamp(st.st_mtime).isoformat(),
+                                "_mtime": st.st_mtime,
+                                "size": st.st_size
+                            })
+                    except Exception:
+                        continue
+        except Exception:
+            pass
+
+        if len(subdirs) == 1:
+            # フラットに近い構成ではスレッドプールのコストをかけない
+            recent_files.extend(_collect_recent(subdirs[0], cutoff_ts))
+        elif subdirs:
+            # stat syscallはGILを解放するため、スレッドでI/Oを重ねられる
+            max_workers = min(32, (os.cpu_count() or 1) * 4, len(subdirs))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_collect_recent, d, cutoff_ts) for d in subdirs]
+                for future in futures:
+                    recent_files.extend(future.result())
+
+        if limit is not None:
+            # 全件をソートせず上位limit件だけ取り出す（O(M log N)）
+            return heapq.nlargest(limit, recent_files, key=operator.itemgetter("_mtime"))
+
+        # 更新日時（floatのまま）でソート
+        recent_files.sort(key=operator.itemgetter("_mtime"), reverse=True)
         return recent_files
     
-    def read_file_content(self, file_path: str) -> str:
-        """ファイル内容を読み込み（Obsidian対応）"""
-        # Obsidianでサポートされるファイル拡張子
-        obsidian_extensions = {'.md', '.txt', '.json', '.csv', '.html', '.xml', '.js', '.ts', '.py', '.css', '.yaml', '.yml'}
-        
+    def read_file_content(self, file_path: str, max_bytes: int = 4096) -> str:
+        """ファイル内容を読み込み（Obsidian対応）
+
+        分析に使うのは先頭のサンプルだけなので、ファイル全体ではなく
+        max_bytesまでしか読み込まない。
+        """
         file_ext = Path(file_path).suffix.lower()
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
+            with open(file_path, 'rb') as f:
+                buf = f.read(max_bytes)
+
+            try:
+                content = buf.decode('utf-8')
+            except UnicodeDecodeError as e:
+                if e.start >= len(buf) - 4:
+                    # 読み切り位置でマルチバイト文字が切れただけのケース
+                    content = buf[:e.start].decode('utf-8')
+                else:
+                    # UTF-8で読めない場合、先頭4KBから文字コードを1回だけ判定
+                    encoding = chardet.detect(buf[:4096]).get("encoding")
+                    if not encoding:
+                        return f"[読み込み不可能なエンコーディング: {file_path}]"
+                    content = f"[{encoding}エンコーディング] " + buf.decode(encoding, errors='replace')
+
             # Obsidianのマークダウンリンク記法を処理
             if file_ext == '.md':
                 content = self._process_obsidian_markdown(content)
                 
             return content
-        except UnicodeDecodeError:
-            # UTF-8で読めない場合、他のエンコーディングを試行
-            encodings = ['shift_jis', 'cp932', 'latin1', 'utf-16']
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        content = f.read()
-                    return f"[{encoding}エンコーディング] {content}"
-                except Exception:
-                    continue
-            return f"[読み込み不可能なエンコーディング: {file_path}]"
         except Exception as e:
             return f"[読み込みエラー: {str(e)}]"
     
     def _process_obsidian_markdown(self, content: str) -> str:
         """Obsidianのマークダウン記法を処理"""
-        import re
-        
         # Obsidianの内部リンク [[リンク名]] を処理
-        content = re.sub(r'\[\[([^\]]+)\]\]', r'[[\1]]（Obsidianリンク）', content)
-        
+        content = _OBS_LINK.sub(r'[[\1]]（Obsidianリンク）', content)
+
         # Obsidianのタグ #タグ名 を処理
-        content = re.sub(r'#([a-zA-Z0-9_\-/]+)', r'#\1（Obsidianタグ）', content)
-        
+        content = _OBS_TAG.sub(r'#\1（Obsidianタグ）', content)
+
         # Obsidianのブロック参照 ^ブロックID を処理
-        content = re.sub(r'\^([a-zA-Z0-9\-]+)', r'^\\1（ブロック参照）', content)
-        
+        content = _OBS_BLOCK.sub(r'^\1（ブロック参照）', content)
+
         return content
     
     def analyze_file_changes(self, files: List[Dict[str, Any]]) -> str:
         """ファイルの変更点を分析してまとめる"""
         if not files:
             return "最新一か月で更新されたファイルはありません。"
-        
-        # ファイル情報をまとめる
-        file_summary = []
-        for file_info in files[:10]:  # 最新10ファイルまで分析
-            content = self.read_file_content(file_info["path"])
-            file_summary.append(f"ファイル: {file_info['path']}\n更新日時: {file_info['modified']}\n内容サンプル:\n{content[:500]}...\n")
-        
-        prompt = f"""
-以下のファイルは最新一か月で更新されたファイルです。
-これらのファイルの変更点や特徴を分析して、簡潔にまとめてください。
 
-ファイル一覧と内容:
-{chr(10).join(file_summary)}
+        # バイナリや巨大ファイルは読んでもLLMに渡せないので先に除外する
+        candidates = [
+            f for f in files
+            if Path(f["path"]).suffix.lower() in OBSIDIAN_EXTS and f["size"] < 1_000_000
+        ][:10]
+        if not candidates:
+            return "最新一か月で更新されたテキストファイルはありません。"
+
+        # ファイルごとの要約を並行生成してから集約する（map-reduce）
+        return asyncio.run(self._analyze_files_async(candidates))
+
+    async def _analyze_files_async(self, files: List[Dict[str, Any]]) -> str:
+        """ファイル単位の要約リクエストを並行発行し、最後に全体をまとめる"""
+        semaphore = asyncio.Semaphore(self.async_ollama.max_concurrency)
+
+        # ファイル読み込みはI/Oバウンドなのでスレッドで並行化してから要約に回す
+        with ThreadPoolExecutor(max_workers=min(10, len(files))) as executor:
+            contents = list(executor.map(
+                self.read_file_content, (f["path"] for f in files)
+            ))
+
+        async with aiohttp.ClientSession() as session:
+            tasks = []
+            for file_info, content in zip(files, contents):
+                map_prompt = f"""
+以下は最近更新されたファイルです。内容の特徴と変更の傾向を3行程度の日本語で要約してください。
+
+ファイル: {file_info['path']}
+更新日時: {file_info['modified']}
+内容サンプル:
+{content[:500]}...
+"""
+                tasks.append(
+                    self.async_ollama.generate(session, self.model, map_prompt, semaphore)
+                )
+
+            summaries = await asyncio.gather(*tasks)
+
+            # 中間リストを作らずgeneratorを直接joinする
+            files_section = "\n".join(
+                f"ファイル: {f['path']}\n更新日時: {f['modified']}\n要約:\n{summary}\n"
+                for f, summary in zip(files, summaries)
+            )
+
+            reduce_prompt = f"""
+以下は最新一か月で更新されたファイルのファイルごとの要約です。
+これらを横断して変更点や特徴を分析し、簡潔にまとめてください。
+
+ファイル一覧と要約:
+{files_section}
 
 分析してほしい点:
 1. どのような種類のファイルが更新されているか
@@ -130,20 +327,52 @@ class FileAnalyzer:
 
 日本語で回答してください。
 """
-        
-        return self.ollama.generate(self.model, prompt)
+
+            return await self.async_ollama.generate(session, self.model, reduce_prompt, semaphore)
     
+    def _cached_analysis(self, recent_files: List[Dict[str, Any]]) -> str:
+        """ファイル一覧とモデルが前回と同一ならLLM分析をスキップして再利用"""
+        key_src = repr(sorted(
+            (f["path"], f["_mtime"], f["size"]) for f in recent_files
+        )) + self.model
+        key = hashlib.blake2b(key_src.encode()).hexdigest()
+        cache_file = Path.home() / ".cache" / "folder_analyzer" / f"{key}.txt"
+
+        try:
+            if cache_file.exists():
+                return cache_file.read_text(encoding='utf-8')
+        except Exception:
+            pass
+
+        analysis = self.analyze_file_changes(recent_files)
+
+        # 一時的な失敗メッセージをキャッシュに固定しないようにする
+        if "エラーが発生しました" not in analysis:
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = cache_file.with_suffix('.tmp')
+                tmp_file.write_text(analysis, encoding='utf-8')
+                tmp_file.replace(cache_file)  # アトミックに置き換え
+            except Exception:
+                pass
+
+        return analysis
+
     def generate_report(self, folder_path: str, days: int = 30) -> Dict[str, Any]:
         """フォルダの更新レポートを生成"""
         try:
             recent_files = self.find_recent_files(folder_path, days)
-            analysis = self.analyze_file_changes(recent_files)
+            analysis = self._cached_analysis(recent_files)
             
             return {
                 "folder_path": folder_path,
                 "analysis_period_days": days,
                 "total_files_found": len(recent_files),
-                "files": recent_files,
+                # ソート用の内部フィールド_mtimeはレポートに含めない
+                "files": [
+                    {k: v for k, v in f.items() if k != "_mtime"}
+                    for f in recent_files
+                ],
                 "analysis": analysis,
                 "generated_at": datetime.now().isoformat()
             }
@@ -0,0 +1,362 @@
+"""ファイル分析エージェント共通のfunction_toolツール群
+
+OpenAI API版とAzure OpenAI Service版の両エージェントから共有される。
+"""
+import asyncio
+import functools
+import os
+import time
+import operator
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+import aiofiles
+import orjson
+from agents import function_tool
+
+# 文字コード判定ライブラリ（cchardetがあれば高速版を優先）
+try:
+    import cchardet as chardet
+except ImportError:
+    import chardet
+
+# ツール境界のJSON変換はorjsonに一本化（stdlib jsonの2-5倍高速）
+def _dumps(obj: Any) -> str:
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+_loads = orjson.loads
+
+# Obsidian記法の正規表現はモジュール読み込み時に一度だけコンパイル
+_OBS_LINK = re.compile(r'\[\[([^\]]+)\]\]')
+_OBS_TAG = re.compile(r'#([a-zA-Z0-9_\-/]+)')
+_OBS_BLOCK = re.compile(r'\^([a-zA-Z0-9\-]+)')
+
+# 走査から除外するディレクトリ（VCS・依存関係・ビルド成果物・キャッシュ類）
+SKIP_DIR_NAMES = frozenset({
+    '.git', 'node_modules', '__pycache__', '.venv',
+    '.mypy_cache', 'dist', 'build', '.next'
+})
+
+# Obsidianでサポートされるファイル拡張子（テキストとして読む対象）
+OBSIDIAN_EXTENSIONS = frozenset({
+    '.md', '.txt', '.json', '.csv', '.html', '.xml',
+    '.js', '.ts', '.py', '.css', '.yaml', '.yml'
+})
+
+
+def _skip_dir(name: str) -> bool:
+    """走査対象外のディレクトリかどうか（隠しディレクトリも除外）"""
+    return name in SKIP_DIR_NAMES or name.startswith('.')
+
+
+def _collect_recent(root: str, cutoff_ts: float) -> List[Dict[str, Any]]:
+    """サブツリーを走査してcutoff以降に更新されたファイル情報を集める"""
+    results = []
+    for entry in _walk(root):
+        try:
+            # statは1回だけ呼び、mtimeとsizeの両方に使い回す
+            st = entry.stat(follow_symlinks=False)
+        except Exception:
+            continue
+        if st.st_mtime > cutoff_ts:
+            results.append({
+                "path": entry.path,
+                "mtime": st.st_mtime,
+                "size": st.st_size,
+                "ext": os.path.splitext(entry.name)[1].lower()
+            })
+    return results
+
+
+def _walk(root: str):
+    """os.scandirでディレクトリを再帰走査し、ファイルのDirEntryを返す"""
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except Exception:
+            continue
+        try:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _skip_dir(entry.name):
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+                except Exception:
+                    continue
+        finally:
+            it.close()
+
+
+def _walk_level(root: str):
+    """単一ディレクトリのエントリを列挙（再帰しない）"""
+    try:
+        it = os.scandir(root)
+    except Exception:
+        return
+    try:
+        yield from it
+    finally:
+        it.close()
+
+
+@functools.lru_cache(maxsize=32)
+def _walk_cached(root: str, days: int, root_mtime_ns: int) -> List[Dict[str, Any]]:
+    """ツリー走査の結果をキャッシュ
+
+    root_mtime_nsがキーに含まれるため、直下のエントリが増減すれば
+    自動的にキャッシュミスになる。戻り値のリストは共有されるので
+    呼び出し側で変更しないこと。
+    """
+    cutoff_ts = (datetime.now() - timedelta(days=days)).timestamp()
+    recent_files = []
+    subdirs = []
+
+    # トップレベルのファイルは直接処理し、サブディレクトリはスレッドに分配
+    for entry in _walk_level(root):
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if not _skip_dir(entry.name):
+                    subdirs.append(entry.path)
+                continue
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            st = entry.stat(follow_symlinks=False)
+        except Exception:
+            continue
+        if st.st_mtime > cutoff_ts:
+            recent_files.append({
+                "path": entry.path,
+                "mtime": st.st_mtime,
+                "size": st.st_size,
+                "ext": os.path.splitext(entry.name)[1].lower()
+            })
+
+    if len(subdirs) == 1:
+        # フラットに近い構成ではスレッドプールのコストをかけない
+        recent_files.extend(_collect_recent(subdirs[0], cutoff_ts))
+    elif subdirs:
+        # stat syscallはGILを解放するため、スレッドでI/Oを重ねられる
+        max_workers = min(32, (os.cpu_count() or 1) * 4, len(subdirs))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_collect_recent, d, cutoff_ts) for d in subdirs]
+            for future in futures:
+                recent_files.extend(future.result())
+
+    # 更新日時（floatのまま）でソート
+    recent_files.sort(key=operator.itemgetter("mtime"), reverse=True)
+    return recent_files
+
+
+@function_tool
+def find_recent_files(folder_path: str, days: int = 30, max_entries: int = 200) -> str:
+    """
+    指定フォルダから最新N日以内のファイルを取得
+
+    Args:
+        folder_path: 分析対象のフォルダパス
+        days: 分析期間（日数）
+        max_entries: 返却する最大ファイル数（更新日時の新しい順）
+
+    Returns:
+        最新ファイルのリスト
+    """
+    folder = Path(folder_path)
+    if not folder.exists():
+        raise ValueError(f"フォルダが存在しません: {folder_path}")
+
+    # ルートのmtimeが変わらない限り、同一(フォルダ, 日数)の再走査をスキップ
+    root = os.path.realpath(folder_path)
+    root_mtime_ns = os.stat(root).st_mtime_ns
+    recent_files = _walk_cached(root, days, root_mtime_ns)
+
+    # LLMに渡すペイロードを上位max_entries件に制限（空ファイルは除外）
+    recent_files = [f for f in recent_files if f["size"] > 0][:max_entries]
+
+    # 切り詰め後の件数分だけISO形式の文字列へ変換
+    # （datetimeオブジェクトを経由せずtime.strftimeで直接整形）
+    recent_files = [
+        {
+            "path": f["path"],
+            "modified": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(f["mtime"])),
+            "size": f["size"],
+            "ext": f["ext"]
+        }
+        for f in recent_files
+    ]
+
+    # インデントなしのコンパクトなJSONでペイロードを最小化
+    return _dumps(recent_files)
+
+
+def _render_content(buf: bytes, file_ext: str, file_path: str, max_chars: int) -> str:
+    """読み込んだバイト列をデコード・切り詰め・Obsidian記法処理して返す"""
+    # 先頭にNULバイトがあればバイナリと判断（拡張子偽装対策）
+    if b'\x00' in buf[:512]:
+        return f"[バイナリ/非対応ファイル: {file_path}]"
+
+    try:
+        content = buf.decode('utf-8')
+    except UnicodeDecodeError as e:
+        if e.start >= len(buf) - 4:
+            # 読み切り位置でマルチバイト文字が切れただけのケース
+            content = buf[:e.start].decode('utf-8')
+        else:
+            # UTF-8で読めない場合、先頭4KBから文字コードを判定
+            encoding = chardet.detect(buf[:4096]).get("encoding")
+            if not encoding:
+                return f"[読み込み不可能なエンコーディング: {file_path}]"
+            content = f"[{encoding}エンコーディング] " + buf.decode(encoding, errors='replace')
+
+    # 内容を制限
+    if len(content) > max_chars:
+        content = content[:max_chars] + "..."
+
+    # Obsidianのマークダウンリンク記法を処理
+    if file_ext == '.md':
+        # Obsidianの内部リンク [[リンク名]] を処理
+        content = _OBS_LINK.sub(r'[[\1]]（Obsidianリンク）', content)
+
+        # Obsidianのタグ #タグ名 を処理
+        content = _OBS_TAG.sub(r'#\1（Obsidianタグ）', content)
+
+        # Obsidianのブロック参照 ^ブロックID を処理
+        content = _OBS_BLOCK.sub(r'^\1（ブロック参照）', content)
+
+    return content
+
+
+@function_tool
+def read_file_content(file_path: str, max_chars: int = 2000, file_size: int = -1) -> str:
+    """
+    ファイル内容を読み込み（Obsidian対応）
+
+    Args:
+        file_path: ファイルパス
+        max_chars: 読み込む最大文字数
+        file_size: find_recent_filesが返したsize（既知ならopenを節約）
+
+    Returns:
+        ファイル内容
+    """
+    file_ext = Path(file_path).suffix.lower()
+
+    # 走査時に取得済みのstat情報を使い回し、空ファイルはopenせずに返す
+    if file_size == 0:
+        return ""
+
+    # テキスト系以外の拡張子はデコードを試みずに打ち切る
+    if file_ext not in OBSIDIAN_EXTENSIONS:
+        return f"[バイナリ/非対応ファイル: {file_path}]"
+
+    try:
+        # バイナリで1回だけ読み、エンコーディングごとの再読込を避ける
+        with open(file_path, 'rb') as f:
+            buf = f.read(max_chars * 4)
+        return _render_content(buf, file_ext, file_path, max_chars)
+    except Exception as e:
+        return f"[読み込みエラー: {str(e)}]"
+
+
+async def _read_one(file_path: str, max_chars: int) -> Dict[str, str]:
+    """1ファイルを非同期に読み込んで整形する"""
+    file_ext = Path(file_path).suffix.lower()
+    if file_ext not in OBSIDIAN_EXTENSIONS:
+        return {"path": file_path, "content": f"[バイナリ/非対応ファイル: {file_path}]"}
+    try:
+        async with aiofiles.open(file_path, 'rb') as f:
+            buf = await f.read(max_chars * 4)
+        content = _render_content(buf, file_ext, file_path, max_chars)
+    except Exception as e:
+        content = f"[読み込みエラー: {str(e)}]"
+    return {"path": file_path, "content": content}
+
+
+@function_tool
+async def read_files_content(paths_json: str, max_chars: int = 2000) -> str:
+    """
+    複数ファイルの内容をまとめて並行読み込み（Obsidian対応）
+
+    Args:
+        paths_json: ファイルパスのリスト（JSON文字列）
+        max_chars: ファイルごとに読み込む最大文字数
+
+    Returns:
+        各ファイルのpathとcontentのリスト（JSON文字列）
+    """
+    try:
+        paths = _loads(paths_json)
+    except orjson.JSONDecodeError:
+        return _dumps({"error": "Invalid JSON format"})
+
+    # ディスクI/Oを重ねて逐次読みの待ち時間を隠す
+    results = await asyncio.gather(*[_read_one(p, max_chars) for p in paths])
+    return _dumps(results)
+
+
+@function_tool
+def analyze_file_types(files_json: str) -> str:
+    """
+    ファイルタイプを分析
+    
+    Args:
+        files_json: ファイル情報のリスト（JSON文字列）
+    
+    Returns:
+        ファイルタイプの統計情報（JSON文字列）
+    """
+    try:
+        files = _loads(files_json)
+    except orjson.JSONDecodeError:
+        return _dumps({"error": "Invalid JSON format"})
+    
+    counts = defaultdict(int)
+    sizes = defaultdict(int)
+
+    for file_info in files:
+        # find_recent_filesが付与したextを再利用（Path構築を回避）
+        ext = file_info.get("ext")
+        if ext is None:
+            ext = os.path.splitext(file_info["path"])[1].lower()
+        ext = ext or "拡張子なし"
+
+        counts[ext] += 1
+        sizes[ext] += file_info["size"]
+
+    total_size = sum(sizes.values())
+    type_stats = {ext: {"count": counts[ext], "total_size": sizes[ext]} for ext in counts}
+
+    result = {
+        "file_types": type_stats,
+        "total_files": len(files),
+        "total_size": total_size
+    }
+    return _dumps(result)
+
+
+@function_tool
+def save_report(report_data: str, output_path: str) -> str:
+    """
+    レポートをJSONファイルに保存
+    
+    Args:
+        report_data: レポートデータ（JSON文字列）
+        output_path: 保存先パス
+    
+    Returns:
+        保存結果メッセージ
+    """
+    try:
+        # 1MBの書き込みバッファでsyscallをまとめる
+        with open(output_path, 'wb', buffering=1024 * 1024) as f:
+            f.write(report_data.encode('utf-8'))
+        return f"レポートを {output_path} に保存しました。"
+    except Exception as e:
+        return f"保存エラー: {str(e)}"
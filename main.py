@@ -1,6 +1,4 @@
 import argparse
-import json
-from file_analyzer import FileAnalyzer
 
 
 def main():
@@ -13,7 +11,10 @@ def main():
     args = parser.parse_args()
     
     print(f"フォルダ「{args.folder}」の最新{args.days}日間のファイルを分析中...")
-    
+
+    # 重いモジュール（requests等）は実際に分析する段になってから読み込む
+    from file_analyzer import FileAnalyzer
+
     analyzer = FileAnalyzer(ollama_model=args.model)
     report = analyzer.generate_report(args.folder, args.days)
     
@@ -37,8 +38,16 @@ def main():
     print(report['analysis'])
     
     if args.output:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        # orjsonがあれば高速なC実装で書き出す（なければstdlib jsonで代替）
+        try:
+            import orjson
+            data = orjson.dumps(report, option=orjson.OPT_INDENT_2)
+        except ImportError:
+            import json
+            data = json.dumps(report, ensure_ascii=False, indent=2).encode('utf-8')
+
+        with open(args.output, 'wb') as f:
+            f.write(data)
         print(f"\n結果を {args.output} に保存しました。")
 
 